@@ -1,30 +1,58 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.middleware.gzip import GZipMiddleware
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+from itertools import chain, islice
 import uuid
+import hashlib
 from datetime import datetime, timezone
 import httpx
+import orjson
+from async_lru import alru_cache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB configuration (the client is created per worker process at startup)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+DB_NAME = os.environ['DB_NAME']
 
 # WaniKani API configuration
 WANIKANI_API_KEY = os.environ.get('WANIKANI_API_KEY', '')
 WANIKANI_BASE_URL = "https://api.wanikani.com/v2"
+WANIKANI_MAX_CONCURRENCY = 8  # Caps parallel requests to WaniKani (does not bound the per-minute request rate)
+SUBJECT_IDS_PER_REQUEST = 50  # IDs per /subjects?ids= lookup
+WANIKANI_CACHE_TTL = 3600  # Seconds to keep fetched kanji subjects in memory
+KANJI_CACHE_CONTROL = f"public, max-age={WANIKANI_CACHE_TTL}, stale-while-revalidate=86400"
+WANIKANI_HEADERS = {
+    "Authorization": f"Bearer {WANIKANI_API_KEY}",
+    "Wanikani-Revision": "20170710"
+}
+
+# These and fetch_kanji_band's alru_cache are module-level rather than created at startup.
+# That is still fork-safe because nothing fills them at import: the semaphore binds to an
+# event loop on first use (Python 3.10+), and the cache and pending map stay empty until a
+# request runs inside the worker, so each process starts with its own empty copies.
+wanikani_semaphore = asyncio.Semaphore(WANIKANI_MAX_CONCURRENCY)
+pending_subjects: Dict[int, asyncio.Future] = {}  # In-flight subject lookups by ID, shared across requests
+
+# Status check write batching
+STATUS_FLUSH_INTERVAL = 0.1  # Seconds to wait for more writes before flushing a batch
+STATUS_MAX_BATCH = 500
+STATUS_WRITE_ATTEMPTS = 3
+STATUS_RETRY_DELAY = 0.5  # Seconds, multiplied by the attempt number
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -102,22 +130,329 @@ class KanjiResponse(BaseModel):
 
 
 # JLPT level mapping (WaniKani levels to JLPT approximation)
-# This is an approximation based on common mappings
+# This is an approximation based on common mappings, ordered by ascending level
 JLPT_LEVEL_MAPPING = {
-    "N5": list(range(1, 11)),      # Levels 1-10
-    "N4": list(range(11, 21)),     # Levels 11-20
-    "N3": list(range(21, 31)),     # Levels 21-30
-    "N2": list(range(31, 51)),     # Levels 31-50
-    "N1": list(range(51, 61)),     # Levels 51-60
+    "N5": range(1, 11),      # Levels 1-10
+    "N4": range(11, 21),     # Levels 11-20
+    "N3": range(21, 31),     # Levels 21-30
+    "N2": range(31, 51),     # Levels 31-50
+    "N1": range(51, 61),     # Levels 51-60
 }
 
+# Flat WaniKani level -> JLPT lookup, built once at import
+LEVEL_TO_JLPT = {level: jlpt for jlpt, levels in JLPT_LEVEL_MAPPING.items() for level in levels}
+
+# WaniKani levels query parameter per JLPT band, built once at import
+LEVELS_PARAM = {jlpt: "&levels=" + ",".join(map(str, levels)) for jlpt, levels in JLPT_LEVEL_MAPPING.items()}
+
 
 def get_jlpt_level(wanikani_level: int) -> str:
     """Convert WaniKani level to approximate JLPT level"""
-    for jlpt, levels in JLPT_LEVEL_MAPPING.items():
-        if wanikani_level in levels:
-            return jlpt
-    return "N1"
+    return LEVEL_TO_JLPT.get(wanikani_level, "N1")
+
+
+def _parse_meanings(raw_meanings: List[dict]) -> List[KanjiMeaning]:
+    """Build KanjiMeaning models from a WaniKani subject's meanings"""
+    return [
+        KanjiMeaning.model_construct(meaning=m.get("meaning", ""), primary=m.get("primary", False))
+        for m in raw_meanings
+    ]
+
+
+def _parse_readings(raw_readings: List[dict]) -> List[KanjiReading]:
+    """Build KanjiReading models from a WaniKani subject's readings"""
+    return [
+        KanjiReading.model_construct(
+            reading=r.get("reading", ""),
+            primary=r.get("primary", False),
+            type=r.get("type", "onyomi")
+        )
+        for r in raw_readings
+    ]
+
+
+def _parse_context(raw_sentences: List[dict]) -> List[ContextSentence]:
+    """Build ContextSentence models from a WaniKani subject's context sentences"""
+    return [ContextSentence.model_construct(ja=cs.get("ja", ""), en=cs.get("en", "")) for cs in raw_sentences]
+
+
+def build_vocab_word(v_item: dict) -> VocabWord:
+    """Build a VocabWord from a raw WaniKani vocabulary subject"""
+    v_data = v_item.get("data", {})
+    # Primary meanings, falling back to the first meaning if none is marked primary
+    raw_meanings = v_data.get("meanings") or ()
+    all_meanings = [m.get("meaning", "") for m in raw_meanings if m.get("primary")]
+    if not all_meanings and raw_meanings:
+        all_meanings = [raw_meanings[0].get("meaning", "")]
+    return VocabWord.model_construct(
+        id=v_item.get("id"),
+        characters=v_data.get("characters", ""),
+        meanings=all_meanings,
+        readings=[r.get("reading", "") for r in v_data.get("readings") or () if r.get("primary")]
+    )
+
+
+def build_radical_component(r_item: dict) -> RadicalComponent:
+    """Build a RadicalComponent from a raw WaniKani radical subject"""
+    r_data = r_item.get("data", {})
+    raw_meanings = r_data.get("meanings") or ()
+    primary_meaning = next(
+        (m.get("meaning", "") for m in raw_meanings if m.get("primary")),
+        raw_meanings[0].get("meaning", "") if raw_meanings else ""
+    )
+    return RadicalComponent.model_construct(
+        id=r_item.get("id"),
+        character=r_data.get("characters"),  # Can be None for image-only radicals
+        slug=r_data.get("slug", ""),
+        meaning=primary_meaning
+    )
+
+
+def build_kanji_subject(
+    kanji_id: int,
+    item_data: dict,
+    vocabulary: List[VocabWord],
+    radicals: List[RadicalComponent]
+) -> KanjiSubject:
+    """Build a KanjiSubject from a raw WaniKani kanji subject's data"""
+    wanikani_level = item_data.get("level", 1)
+    return KanjiSubject.model_construct(
+        id=kanji_id,
+        character=item_data.get("characters", ""),
+        meanings=_parse_meanings(item_data.get("meanings", [])),
+        readings=_parse_readings(item_data.get("readings", [])),
+        level=wanikani_level,
+        meaning_mnemonic=item_data.get("meaning_mnemonic", ""),
+        reading_mnemonic=item_data.get("reading_mnemonic", ""),
+        context_sentences=_parse_context(item_data.get("context_sentences", [])),
+        vocabulary=vocabulary,
+        radicals=radicals,
+        jlpt_level=get_jlpt_level(wanikani_level)
+    )
+
+
+def cacheable_json_response(request: Request, content: dict, cacheable: bool = True) -> Response:
+    """
+    Serialize content to JSON with an ETag and Cache-Control so browsers and CDNs
+    can reuse it, answering 304 when the client already holds the same body.
+    Incomplete (non-cacheable) content is sent with no-store and no ETag instead.
+    """
+    body = orjson.dumps(content)
+    if not cacheable:
+        return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+    # Weak, since GZipMiddleware may re-encode the body after this tag is computed
+    opaque_tag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": f"W/{opaque_tag}", "Cache-Control": KANJI_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or opaque_tag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def get_wk_client(request: Request) -> httpx.AsyncClient:
+    """Shared WaniKani client, created once per process at startup"""
+    return request.app.state.wk_client
+
+
+@alru_cache(maxsize=8, ttl=WANIKANI_CACHE_TTL)
+async def fetch_kanji_band(http_client: httpx.AsyncClient, jlpt: str) -> List[dict]:
+    """
+    Fetch raw kanji subjects for one JLPT band, cached in-process.
+
+    WaniKani subject data changes rarely, so a band is only re-fetched once its
+    cache entry expires. Failed fetches raise and are not cached.
+    """
+    next_url = f"/subjects?types=kanji{LEVELS_PARAM[jlpt]}"
+    kanji_raw = []  # Store raw data with amalgamation IDs
+    async with wanikani_semaphore:
+        while next_url:
+            response = await http_client.get(next_url)
+
+            if response.status_code != 200:
+                logger.error(f"WaniKani API error: {response.status_code} - {response.text}")
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail=f"WaniKani API error: {response.text}"
+                )
+
+            data = orjson.loads(response.content)
+
+            for item in data.get("data", []):
+                item_data = item.get("data", {})
+                kanji_raw.append({
+                    "id": item.get("id", 0),
+                    "data": item_data,
+                    "amalgamation_ids": item_data.get("amalgamation_subject_ids", []),
+                    "component_ids": item_data.get("component_subject_ids", [])
+                })
+
+            # Check for next page
+            next_url = data.get("pages", {}).get("next_url")
+
+    # Sort once at fetch time so requests can page through bands without re-sorting
+    kanji_raw.sort(key=lambda x: x["data"].get("level", 1))
+    return kanji_raw
+
+
+async def fetch_kanji_bands(http_client: httpx.AsyncClient, jlpt_levels: List[str]) -> List[List[dict]]:
+    """
+    Fetch raw kanji subjects for the given JLPT bands, one list per band.
+
+    WaniKani paginates with an opaque page_after_id cursor, so pages of a single
+    query can't be requested ahead of time. Instead each JLPT band is queried
+    separately (a band fits in one 1000-item page) and the bands run concurrently.
+    Bands come back in the order requested, each sorted by level; the lists are
+    shared cache entries and must not be mutated.
+    """
+    return await asyncio.gather(*(fetch_kanji_band(http_client, jlpt) for jlpt in jlpt_levels))
+
+
+async def fetch_subjects_by_ids(http_client: httpx.AsyncClient, subject_ids: Iterable[int]) -> List[dict]:
+    """
+    Fetch WaniKani subjects by ID.
+
+    IDs are split into chunks of SUBJECT_IDS_PER_REQUEST so no single URL gets
+    too long; the chunks are multiplexed concurrently over the shared HTTP/2
+    connection. Chunks that fail are skipped, leaving those subjects out.
+
+    IDs another request is already fetching are not requested again; this call
+    waits on that request's result instead.
+    """
+    loop = asyncio.get_running_loop()
+    futures = []
+    to_fetch = {}  # IDs this call is responsible for fetching
+    for subject_id in subject_ids:
+        future = pending_subjects.get(subject_id)
+        if future is None:
+            future = pending_subjects[subject_id] = to_fetch[subject_id] = loop.create_future()
+        futures.append(future)
+
+    if to_fetch:
+        fetch_ids = list(to_fetch)
+        chunks = [
+            fetch_ids[i:i + SUBJECT_IDS_PER_REQUEST]
+            for i in range(0, len(fetch_ids), SUBJECT_IDS_PER_REQUEST)
+        ]
+
+        async def fetch_chunk(chunk: List[int]) -> List[dict]:
+            async with wanikani_semaphore:
+                response = await http_client.get(f"/subjects?ids={','.join(map(str, chunk))}")
+            if response.status_code != 200:
+                return []
+            return orjson.loads(response.content).get("data", [])
+
+        try:
+            results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+            for items in results:
+                for item in items:
+                    future = to_fetch.get(item.get("id"))
+                    if future is not None and not future.done():
+                        future.set_result(item)
+        finally:
+            # Anything not found (or left unfinished by an error) resolves as missing for every waiter
+            for subject_id, future in to_fetch.items():
+                del pending_subjects[subject_id]
+                if not future.done():
+                    future.set_result(None)
+
+    # Shield the shared futures: cancelling this call must not cancel them for their owner or other waiters
+    results = await asyncio.gather(*(asyncio.shield(future) for future in futures))
+    return [item for item in results if item is not None]
+
+
+async def build_kanji_page(
+    http_client: httpx.AsyncClient,
+    paginated_raw: List[dict]
+) -> Tuple[List[KanjiSubject], bool]:
+    """
+    Build kanji for one page, with their vocabulary (up to 5 per kanji) and radicals.
+
+    Also returns whether every requested vocabulary and radical subject came back.
+    Failed lookups (e.g. a WaniKani 429) are left out of the page, which must then
+    not be cached downstream.
+    """
+    # Collect all vocabulary IDs we need to fetch (limit to 5 per kanji for performance)
+    vocab_ids_to_fetch = set()
+    radical_ids_to_fetch = set()
+    for kanji_raw in paginated_raw:
+        vocab_ids_to_fetch.update(kanji_raw["amalgamation_ids"][:5])
+        radical_ids_to_fetch.update(kanji_raw["component_ids"])
+
+    # Fetch vocabulary and radicals concurrently
+    vocab_items, radical_items = await asyncio.gather(
+        fetch_subjects_by_ids(http_client, vocab_ids_to_fetch),
+        fetch_subjects_by_ids(http_client, radical_ids_to_fetch)
+    )
+    vocab_map = {v_item.get("id"): build_vocab_word(v_item) for v_item in vocab_items}
+    radical_map = {r_item.get("id"): build_radical_component(r_item) for r_item in radical_items}
+    complete = vocab_ids_to_fetch <= vocab_map.keys() and radical_ids_to_fetch <= radical_map.keys()
+
+    kanji = [
+        build_kanji_subject(
+            kanji_raw["id"],
+            kanji_raw["data"],
+            [vocab_map[v_id] for v_id in kanji_raw["amalgamation_ids"][:5] if v_id in vocab_map],
+            [radical_map[r_id] for r_id in kanji_raw["component_ids"] if r_id in radical_map]
+        )
+        for kanji_raw in paginated_raw
+    ]
+    return kanji, complete
+
+
+def get_db(request: Request) -> AsyncIOMotorDatabase:
+    """Mongo database for this worker process, connected at startup"""
+    return request.app.state.db
+
+
+def get_status_queue(request: Request) -> asyncio.Queue:
+    """Pending status check documents, drained by status_writer"""
+    return request.app.state.status_queue
+
+
+async def write_status_batch(db: AsyncIOMotorDatabase, docs: List[dict]) -> None:
+    """
+    Insert a batch of status checks, retrying failed writes.
+
+    POST /api/status has already answered 200 for these documents, so a batch that
+    still fails after STATUS_WRITE_ATTEMPTS is logged and dropped: this trades the
+    baseline's per-request durability for batched writes.
+    """
+    for attempt in range(1, STATUS_WRITE_ATTEMPTS + 1):
+        try:
+            # Unordered so one bad document doesn't block the rest of the batch
+            await db.status_checks.insert_many(docs, ordered=False)
+            return
+        except BulkWriteError as e:
+            # Documents keep their _id across attempts, so duplicates mean an earlier attempt stored them
+            if all(error.get("code") == 11000 for error in e.details.get("writeErrors", [])) \
+                    and not e.details.get("writeConcernErrors"):
+                return
+            error = e
+        except Exception as e:
+            error = e
+        
+        if attempt < STATUS_WRITE_ATTEMPTS:
+            logger.warning(f"Retrying write of {len(docs)} status checks (attempt {attempt}): {str(error)}")
+            await asyncio.sleep(STATUS_RETRY_DELAY * attempt)
+        else:
+            logger.error(f"Dropping {len(docs)} status checks after {attempt} failed writes: {str(error)}")
+
+
+async def status_writer(queue: asyncio.Queue, db: AsyncIOMotorDatabase) -> None:
+    """Coalesce queued status checks into insert_many batches until a None sentinel arrives"""
+    while True:
+        # Wait for a write, then give concurrent requests a moment to join the batch
+        batch = [await queue.get()]
+        await asyncio.sleep(STATUS_FLUSH_INTERVAL)
+        while not queue.empty() and len(batch) < STATUS_MAX_BATCH:
+            batch.append(queue.get_nowait())
+        
+        docs = [doc for doc in batch if doc is not None]
+        if docs:
+            await write_status_batch(db, docs)
+        
+        if len(docs) < len(batch):
+            return
 
 
 # Routes
@@ -127,29 +462,38 @@ async def root():
 
 
 @api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
+async def create_status_check(
+    input: StatusCheckCreate,
+    status_queue: asyncio.Queue = Depends(get_status_queue)
+):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    _ = await db.status_checks.insert_one(doc)
+    # Persisted by status_writer in the next batch; the 200 is sent before the write,
+    # so a batch that keeps failing after retries is lost (see write_status_batch)
+    status_queue.put_nowait(doc)
     return status_obj
 
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
-    return status_checks
+async def get_status_checks(db: AsyncIOMotorDatabase = Depends(get_db)):
+    # Timestamps are stored as BSON dates; rows written before that hold ISO strings,
+    # which Mongo converts server-side (anything unparseable is passed through as-is)
+    pipeline = [
+        {"$limit": 1000},
+        {"$addFields": {"timestamp": {"$convert": {"input": "$timestamp", "to": "date", "onError": "$timestamp"}}}},
+        {"$project": {"_id": 0}},
+    ]
+    return await db.status_checks.aggregate(pipeline).to_list(1000)
 
 
 @api_router.get("/kanji", response_model=KanjiResponse)
 async def get_kanji(
+    request: Request,
     jlpt_level: Optional[str] = Query(None, description="JLPT level (N5, N4, N3, N2, N1)"),
     page: int = Query(1, ge=1, description="Page number"),
-    per_page: int = Query(20, ge=1, le=100, description="Items per page")
+    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    http_client: httpx.AsyncClient = Depends(get_wk_client)
 ):
     """
     Fetch kanji from WaniKani API with optional JLPT level filtering and pagination.
@@ -157,180 +501,35 @@ async def get_kanji(
     if not WANIKANI_API_KEY:
         raise HTTPException(status_code=500, detail="WaniKani API key not configured")
     
-    headers = {
-        "Authorization": f"Bearer {WANIKANI_API_KEY}",
-        "Wanikani-Revision": "20170710"
-    }
-    
-    # Build levels parameter based on JLPT filter
-    levels_param = ""
+    # Restrict to one JLPT band if requested, otherwise fetch every band
     if jlpt_level and jlpt_level.upper() in JLPT_LEVEL_MAPPING:
-        levels = JLPT_LEVEL_MAPPING[jlpt_level.upper()]
-        levels_param = f"&levels={','.join(map(str, levels))}"
-    
-    all_kanji_raw = []  # Store raw data with amalgamation IDs
-    next_url = f"{WANIKANI_BASE_URL}/subjects?types=kanji{levels_param}"
+        jlpt_levels = [jlpt_level.upper()]
+    else:
+        jlpt_levels = list(JLPT_LEVEL_MAPPING)
     
     try:
-        async with httpx.AsyncClient(timeout=60.0) as http_client:
-            # Fetch all kanji (WaniKani returns paginated results)
-            while next_url:
-                response = await http_client.get(next_url, headers=headers)
-                
-                if response.status_code != 200:
-                    logger.error(f"WaniKani API error: {response.status_code} - {response.text}")
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"WaniKani API error: {response.text}"
-                    )
-                
-                data = response.json()
-                
-                for item in data.get("data", []):
-                    item_data = item.get("data", {})
-                    all_kanji_raw.append({
-                        "id": item.get("id", 0),
-                        "data": item_data,
-                        "amalgamation_ids": item_data.get("amalgamation_subject_ids", []),
-                        "component_ids": item_data.get("component_subject_ids", [])
-                    })
-                
-                # Check for next page
-                next_url = data.get("pages", {}).get("next_url")
-            
-            # Sort kanji by WaniKani level (ascending)
-            all_kanji_raw.sort(key=lambda x: x["data"].get("level", 1))
-            
-            # Apply pagination after sorting
-            total_count = len(all_kanji_raw)
-            total_pages = (total_count + per_page - 1) // per_page
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            paginated_raw = all_kanji_raw[start_idx:end_idx]
-            
-            # Collect all vocabulary IDs we need to fetch (limit to 5 per kanji for performance)
-            vocab_ids_to_fetch = set()
-            radical_ids_to_fetch = set()
-            for kanji_raw in paginated_raw:
-                vocab_ids = kanji_raw["amalgamation_ids"][:5]  # Limit to 5 vocab per kanji
-                vocab_ids_to_fetch.update(vocab_ids)
-                radical_ids_to_fetch.update(kanji_raw["component_ids"])
-            
-            # Fetch vocabulary in batch if we have any
-            vocab_map = {}
-            if vocab_ids_to_fetch:
-                vocab_ids_str = ",".join(map(str, vocab_ids_to_fetch))
-                vocab_url = f"{WANIKANI_BASE_URL}/subjects?ids={vocab_ids_str}"
-                vocab_response = await http_client.get(vocab_url, headers=headers)
-                
-                if vocab_response.status_code == 200:
-                    vocab_data = vocab_response.json()
-                    for v_item in vocab_data.get("data", []):
-                        v_id = v_item.get("id")
-                        v_data = v_item.get("data", {})
-                        # Get all meanings, not just primary
-                        all_meanings = [m.get("meaning", "") for m in v_data.get("meanings", []) if m.get("primary")]
-                        if not all_meanings:
-                            all_meanings = [m.get("meaning", "") for m in v_data.get("meanings", [])[:1]]
-                        vocab_map[v_id] = VocabWord(
-                            id=v_id,
-                            characters=v_data.get("characters", ""),
-                            meanings=all_meanings,
-                            readings=[r.get("reading", "") for r in v_data.get("readings", []) if r.get("primary")]
-                        )
-            
-            # Fetch radicals in batch if we have any
-            radical_map = {}
-            if radical_ids_to_fetch:
-                radical_ids_str = ",".join(map(str, radical_ids_to_fetch))
-                radical_url = f"{WANIKANI_BASE_URL}/subjects?ids={radical_ids_str}"
-                radical_response = await http_client.get(radical_url, headers=headers)
-                
-                if radical_response.status_code == 200:
-                    radical_data = radical_response.json()
-                    for r_item in radical_data.get("data", []):
-                        r_id = r_item.get("id")
-                        r_data = r_item.get("data", {})
-                        primary_meaning = next(
-                            (m.get("meaning", "") for m in r_data.get("meanings", []) if m.get("primary")),
-                            r_data.get("meanings", [{}])[0].get("meaning", "") if r_data.get("meanings") else ""
-                        )
-                        radical_map[r_id] = RadicalComponent(
-                            id=r_id,
-                            character=r_data.get("characters"),  # Can be None for image-only radicals
-                            slug=r_data.get("slug", ""),
-                            meaning=primary_meaning
-                        )
-            
-            # Build final kanji objects with vocabulary
-            paginated_kanji = []
-            for kanji_raw in paginated_raw:
-                item_data = kanji_raw["data"]
-                
-                # Extract meanings
-                meanings = [
-                    KanjiMeaning(
-                        meaning=m.get("meaning", ""),
-                        primary=m.get("primary", False)
-                    )
-                    for m in item_data.get("meanings", [])
-                ]
-                
-                # Extract readings
-                readings = [
-                    KanjiReading(
-                        reading=r.get("reading", ""),
-                        primary=r.get("primary", False),
-                        type=r.get("type", "onyomi")
-                    )
-                    for r in item_data.get("readings", [])
-                ]
-                
-                wanikani_level = item_data.get("level", 1)
-                
-                # Extract context sentences
-                context_sentences = [
-                    ContextSentence(
-                        ja=cs.get("ja", ""),
-                        en=cs.get("en", "")
-                    )
-                    for cs in item_data.get("context_sentences", [])
-                ]
-                
-                # Get vocabulary for this kanji
-                vocab_list = []
-                for v_id in kanji_raw["amalgamation_ids"][:5]:
-                    if v_id in vocab_map:
-                        vocab_list.append(vocab_map[v_id])
-                
-                # Get radicals for this kanji
-                radical_list = []
-                for r_id in kanji_raw["component_ids"]:
-                    if r_id in radical_map:
-                        radical_list.append(radical_map[r_id])
-                
-                kanji_subject = KanjiSubject(
-                    id=kanji_raw["id"],
-                    character=item_data.get("characters", ""),
-                    meanings=meanings,
-                    readings=readings,
-                    level=wanikani_level,
-                    meaning_mnemonic=item_data.get("meaning_mnemonic", ""),
-                    reading_mnemonic=item_data.get("reading_mnemonic", ""),
-                    context_sentences=context_sentences,
-                    vocabulary=vocab_list,
-                    radicals=radical_list,
-                    jlpt_level=get_jlpt_level(wanikani_level)
-                )
-                paginated_kanji.append(kanji_subject)
+        # Fetch all kanji (bands are requested concurrently)
+        bands = await fetch_kanji_bands(http_client, jlpt_levels)
+        
+        # Bands cover ascending level ranges and are each sorted by level, so walking
+        # them in order yields kanji sorted by WaniKani level; stop once the page is filled
+        total_count = sum(len(band) for band in bands)
+        total_pages = (total_count + per_page - 1) // per_page
+        start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
+        paginated_raw = list(islice(chain.from_iterable(bands), start_idx, end_idx))
         
-        return KanjiResponse(
+        paginated_kanji, complete = await build_kanji_page(http_client, paginated_raw)
+        
+        # Data comes from WaniKani and is already well-formed, so skip re-validating
+        # it against response_model and serialize straight to JSON
+        return cacheable_json_response(request, KanjiResponse.model_construct(
             kanji=paginated_kanji,
             total_count=total_count,
             page=page,
             per_page=per_page,
             total_pages=total_pages
-        )
+        ).model_dump(), cacheable=complete)
         
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Request to WaniKani API timed out")
@@ -341,9 +540,11 @@ async def get_kanji(
 
 @api_router.get("/kanji/search", response_model=KanjiResponse)
 async def search_kanji(
+    request: Request,
     query: str = Query(..., min_length=1, description="Search query (kanji character, meaning, or reading)"),
     page: int = Query(1, ge=1, description="Page number"),
-    per_page: int = Query(20, ge=1, le=100, description="Items per page")
+    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    http_client: httpx.AsyncClient = Depends(get_wk_client)
 ):
     """
     Search kanji by character, meaning, or reading.
@@ -351,183 +552,52 @@ async def search_kanji(
     if not WANIKANI_API_KEY:
         raise HTTPException(status_code=500, detail="WaniKani API key not configured")
     
-    headers = {
-        "Authorization": f"Bearer {WANIKANI_API_KEY}",
-        "Wanikani-Revision": "20170710"
-    }
-    
-    all_kanji_raw = []
-    next_url = f"{WANIKANI_BASE_URL}/subjects?types=kanji"
-    
     try:
-        async with httpx.AsyncClient(timeout=60.0) as http_client:
-            # Fetch all kanji
-            while next_url:
-                response = await http_client.get(next_url, headers=headers)
-                
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail=f"WaniKani API error: {response.text}"
-                    )
-                
-                data = response.json()
-                
-                for item in data.get("data", []):
-                    item_data = item.get("data", {})
-                    all_kanji_raw.append({
-                        "id": item.get("id", 0),
-                        "data": item_data,
-                        "amalgamation_ids": item_data.get("amalgamation_subject_ids", []),
-                        "component_ids": item_data.get("component_subject_ids", [])
-                    })
-                
-                next_url = data.get("pages", {}).get("next_url")
-            
-            # Filter kanji by search query
-            query_lower = query.lower()
-            filtered_kanji = []
-            
-            for kanji_raw in all_kanji_raw:
-                item_data = kanji_raw["data"]
-                
-                # Check if query matches character
-                if item_data.get("characters", "") == query:
-                    filtered_kanji.append(kanji_raw)
-                    continue
-                
-                # Check if query matches any meaning
-                meanings = item_data.get("meanings", [])
-                if any(query_lower in m.get("meaning", "").lower() for m in meanings):
-                    filtered_kanji.append(kanji_raw)
-                    continue
-                
-                # Check if query matches any reading
-                readings = item_data.get("readings", [])
-                if any(query_lower == r.get("reading", "").lower() for r in readings):
-                    filtered_kanji.append(kanji_raw)
-                    continue
-            
-            # Sort by level
-            filtered_kanji.sort(key=lambda x: x["data"].get("level", 1))
-            
-            # Apply pagination
-            total_count = len(filtered_kanji)
-            total_pages = max(1, (total_count + per_page - 1) // per_page)
-            start_idx = (page - 1) * per_page
-            end_idx = start_idx + per_page
-            paginated_raw = filtered_kanji[start_idx:end_idx]
-            
-            # Collect vocabulary and radical IDs
-            vocab_ids_to_fetch = set()
-            radical_ids_to_fetch = set()
-            for kanji_raw in paginated_raw:
-                vocab_ids = kanji_raw["amalgamation_ids"][:5]
-                vocab_ids_to_fetch.update(vocab_ids)
-                radical_ids_to_fetch.update(kanji_raw["component_ids"])
+        # Fetch all kanji
+        all_kanji_raw = chain.from_iterable(await fetch_kanji_bands(http_client, list(JLPT_LEVEL_MAPPING)))
+        
+        # Filter kanji by search query (bands are walked in level order, so matches stay sorted)
+        query_lower = query.lower()
+        filtered_kanji = []
+        
+        for kanji_raw in all_kanji_raw:
+            item_data = kanji_raw["data"]
             
-            # Fetch vocabulary
-            vocab_map = {}
-            if vocab_ids_to_fetch:
-                vocab_ids_str = ",".join(map(str, vocab_ids_to_fetch))
-                vocab_url = f"{WANIKANI_BASE_URL}/subjects?ids={vocab_ids_str}"
-                vocab_response = await http_client.get(vocab_url, headers=headers)
-                
-                if vocab_response.status_code == 200:
-                    vocab_data = vocab_response.json()
-                    for v_item in vocab_data.get("data", []):
-                        v_id = v_item.get("id")
-                        v_data = v_item.get("data", {})
-                        all_meanings = [m.get("meaning", "") for m in v_data.get("meanings", []) if m.get("primary")]
-                        if not all_meanings:
-                            all_meanings = [m.get("meaning", "") for m in v_data.get("meanings", [])[:1]]
-                        vocab_map[v_id] = VocabWord(
-                            id=v_id,
-                            characters=v_data.get("characters", ""),
-                            meanings=all_meanings,
-                            readings=[r.get("reading", "") for r in v_data.get("readings", []) if r.get("primary")]
-                        )
+            # Check if query matches character
+            if item_data.get("characters", "") == query:
+                filtered_kanji.append(kanji_raw)
+                continue
             
-            # Fetch radicals
-            radical_map = {}
-            if radical_ids_to_fetch:
-                radical_ids_str = ",".join(map(str, radical_ids_to_fetch))
-                radical_url = f"{WANIKANI_BASE_URL}/subjects?ids={radical_ids_str}"
-                radical_response = await http_client.get(radical_url, headers=headers)
-                
-                if radical_response.status_code == 200:
-                    radical_data = radical_response.json()
-                    for r_item in radical_data.get("data", []):
-                        r_id = r_item.get("id")
-                        r_data = r_item.get("data", {})
-                        primary_meaning = next(
-                            (m.get("meaning", "") for m in r_data.get("meanings", []) if m.get("primary")),
-                            r_data.get("meanings", [{}])[0].get("meaning", "") if r_data.get("meanings") else ""
-                        )
-                        radical_map[r_id] = RadicalComponent(
-                            id=r_id,
-                            character=r_data.get("characters"),
-                            slug=r_data.get("slug", ""),
-                            meaning=primary_meaning
-                        )
+            # Check if query matches any meaning
+            meanings = item_data.get("meanings", [])
+            if any(query_lower in m.get("meaning", "").lower() for m in meanings):
+                filtered_kanji.append(kanji_raw)
+                continue
             
-            # Build kanji objects
-            paginated_kanji = []
-            for kanji_raw in paginated_raw:
-                item_data = kanji_raw["data"]
-                
-                meanings = [
-                    KanjiMeaning(
-                        meaning=m.get("meaning", ""),
-                        primary=m.get("primary", False)
-                    )
-                    for m in item_data.get("meanings", [])
-                ]
-                
-                readings = [
-                    KanjiReading(
-                        reading=r.get("reading", ""),
-                        primary=r.get("primary", False),
-                        type=r.get("type", "onyomi")
-                    )
-                    for r in item_data.get("readings", [])
-                ]
-                
-                wanikani_level = item_data.get("level", 1)
-                
-                context_sentences = [
-                    ContextSentence(
-                        ja=cs.get("ja", ""),
-                        en=cs.get("en", "")
-                    )
-                    for cs in item_data.get("context_sentences", [])
-                ]
-                
-                vocab_list = [vocab_map[v_id] for v_id in kanji_raw["amalgamation_ids"][:5] if v_id in vocab_map]
-                radical_list = [radical_map[r_id] for r_id in kanji_raw["component_ids"] if r_id in radical_map]
-                
-                kanji_subject = KanjiSubject(
-                    id=kanji_raw["id"],
-                    character=item_data.get("characters", ""),
-                    meanings=meanings,
-                    readings=readings,
-                    level=wanikani_level,
-                    meaning_mnemonic=item_data.get("meaning_mnemonic", ""),
-                    reading_mnemonic=item_data.get("reading_mnemonic", ""),
-                    context_sentences=context_sentences,
-                    vocabulary=vocab_list,
-                    radicals=radical_list,
-                    jlpt_level=get_jlpt_level(wanikani_level)
-                )
-                paginated_kanji.append(kanji_subject)
+            # Check if query matches any reading
+            readings = item_data.get("readings", [])
+            if any(query_lower == r.get("reading", "").lower() for r in readings):
+                filtered_kanji.append(kanji_raw)
+                continue
         
-        return KanjiResponse(
+        # Apply pagination
+        total_count = len(filtered_kanji)
+        total_pages = max(1, (total_count + per_page - 1) // per_page)
+        start_idx = (page - 1) * per_page
+        end_idx = start_idx + per_page
+        paginated_raw = filtered_kanji[start_idx:end_idx]
+        
+        paginated_kanji, complete = await build_kanji_page(http_client, paginated_raw)
+        
+        # Data comes from WaniKani and is already well-formed, so skip re-validating
+        # it against response_model and serialize straight to JSON
+        return cacheable_json_response(request, KanjiResponse.model_construct(
             kanji=paginated_kanji,
             total_count=total_count,
             page=page,
             per_page=per_page,
             total_pages=total_pages
-        )
+        ).model_dump(), cacheable=complete)
         
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Request to WaniKani API timed out")
@@ -539,77 +609,34 @@ async def search_kanji(
 
 
 @api_router.get("/kanji/{kanji_id}")
-async def get_kanji_by_id(kanji_id: int):
+async def get_kanji_by_id(
+    kanji_id: int,
+    request: Request,
+    http_client: httpx.AsyncClient = Depends(get_wk_client)
+):
     """
     Fetch a specific kanji by its ID from WaniKani API.
     """
     if not WANIKANI_API_KEY:
         raise HTTPException(status_code=500, detail="WaniKani API key not configured")
     
-    headers = {
-        "Authorization": f"Bearer {WANIKANI_API_KEY}",
-        "Wanikani-Revision": "20170710"
-    }
-    
     try:
-        async with httpx.AsyncClient(timeout=30.0) as http_client:
-            response = await http_client.get(
-                f"{WANIKANI_BASE_URL}/subjects/{kanji_id}",
-                headers=headers
-            )
-            
-            if response.status_code == 404:
-                raise HTTPException(status_code=404, detail="Kanji not found")
-            
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"WaniKani API error: {response.text}"
-                )
-            
-            item = response.json()
-            item_data = item.get("data", {})
-            
-            meanings = [
-                KanjiMeaning(
-                    meaning=m.get("meaning", ""),
-                    primary=m.get("primary", False)
-                )
-                for m in item_data.get("meanings", [])
-            ]
-            
-            readings = [
-                KanjiReading(
-                    reading=r.get("reading", ""),
-                    primary=r.get("primary", False),
-                    type=r.get("type", "onyomi")
-                )
-                for r in item_data.get("readings", [])
-            ]
-            
-            wanikani_level = item_data.get("level", 1)
-            
-            # Extract context sentences
-            context_sentences = [
-                ContextSentence(
-                    ja=cs.get("ja", ""),
-                    en=cs.get("en", "")
-                )
-                for cs in item_data.get("context_sentences", [])
-            ]
-            
-            return KanjiSubject(
-                id=item.get("id", 0),
-                character=item_data.get("characters", ""),
-                meanings=meanings,
-                readings=readings,
-                level=wanikani_level,
-                meaning_mnemonic=item_data.get("meaning_mnemonic", ""),
-                reading_mnemonic=item_data.get("reading_mnemonic", ""),
-                context_sentences=context_sentences,
-                jlpt_level=get_jlpt_level(wanikani_level)
+        response = await http_client.get(f"/subjects/{kanji_id}", timeout=30.0)
+        
+        if response.status_code == 404:
+            raise HTTPException(status_code=404, detail="Kanji not found")
+        
+        if response.status_code != 200:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"WaniKani API error: {response.text}"
             )
-            
+        
+        item = orjson.loads(response.content)
+        item_data = item.get("data", {})
+        
+        return cacheable_json_response(request, build_kanji_subject(item.get("id", 0), item_data, [], []).model_dump())
+        
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Request to WaniKani API timed out")
     except httpx.RequestError as e:
@@ -627,7 +654,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Kanji pages are large, repetitive JSON (mnemonics, meanings) and compress well
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+
+@app.on_event("startup")
+async def startup_wk_client():
+    # Reuse one pooled client per worker so keep-alive/HTTP2 connections to WaniKani survive across requests
+    app.state.wk_client = httpx.AsyncClient(
+        base_url=WANIKANI_BASE_URL,
+        headers=WANIKANI_HEADERS,
+        http2=True,
+        timeout=60.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+    )
+
+
+@app.on_event("startup")
+async def startup_db_client():
+    # Connect inside the worker's event loop; a client created at import would be
+    # shared across fork() by multi-worker servers such as gunicorn --preload
+    app.state.mongo = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    app.state.db = app.state.mongo[DB_NAME]
+
+
+@app.on_event("startup")
+async def startup_status_writer():
+    app.state.status_queue = asyncio.Queue()
+    app.state.status_writer = asyncio.create_task(status_writer(app.state.status_queue, app.state.db))
+
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    # Let the batch writer persist anything still queued before closing Mongo
+    app.state.status_queue.put_nowait(None)
+    await app.state.status_writer
+    app.state.mongo.close()
+    await app.state.wk_client.aclose()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import orjson
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+import server  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+
+class SlowSubjectsClient:
+    """Answers /subjects?ids= lookups after a short delay, recording each URL"""
+
+    def __init__(self):
+        self.urls = []
+
+    async def get(self, url):
+        self.urls.append(url)
+        await asyncio.sleep(0.05)
+        ids = [int(i) for i in url.split("ids=")[1].split(",")]
+        return FakeResponse(200, orjson.dumps({"data": [{"id": i, "data": {}} for i in ids]}))
+
+
+def test_fetch_subjects_by_ids_coalesces_in_flight_ids():
+    async def run():
+        http_client = SlowSubjectsClient()
+        first, second = await asyncio.gather(
+            server.fetch_subjects_by_ids(http_client, [1, 2, 3]),
+            server.fetch_subjects_by_ids(http_client, [2, 3]),
+        )
+        return http_client, first, second
+
+    http_client, first, second = asyncio.run(run())
+
+    assert http_client.urls == ["/subjects?ids=1,2,3"]
+    assert sorted(item["id"] for item in first) == [1, 2, 3]
+    assert sorted(item["id"] for item in second) == [2, 3]
+    assert server.pending_subjects == {}
+
+
+def test_cancelling_a_waiter_does_not_cancel_the_owner():
+    async def run():
+        http_client = SlowSubjectsClient()
+        owner = asyncio.create_task(server.fetch_subjects_by_ids(http_client, [1, 2, 3]))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(server.fetch_subjects_by_ids(http_client, [1, 2, 3]))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return http_client, await owner
+
+    http_client, owner_items = asyncio.run(run())
+
+    assert http_client.urls == ["/subjects?ids=1,2,3"]
+    assert sorted(item["id"] for item in owner_items) == [1, 2, 3]
+    assert server.pending_subjects == {}
+
+
+class RateLimitedClient:
+    """Rejects every /subjects?ids= lookup with a 429"""
+
+    async def get(self, url):
+        return FakeResponse(429, b"")
+
+
+def test_build_kanji_page_reports_failed_lookups_as_incomplete():
+    kanji_raw = {"id": 440, "data": {"level": 1}, "amalgamation_ids": [2467], "component_ids": [1]}
+
+    kanji, complete = asyncio.run(server.build_kanji_page(RateLimitedClient(), [kanji_raw]))
+
+    assert not complete
+    assert kanji[0].vocabulary == []
+    assert kanji[0].radicals == []
+
+
+def test_build_kanji_page_complete_when_every_lookup_returns():
+    kanji_raw = {"id": 440, "data": {"level": 1}, "amalgamation_ids": [2467], "component_ids": [1]}
+
+    _, complete = asyncio.run(server.build_kanji_page(SlowSubjectsClient(), [kanji_raw]))
+
+    assert complete